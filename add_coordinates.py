@@ -17,6 +17,92 @@ FONT_SIZE = 7                           # Font size for coordinate labels
 # =======================================
 
 
+# Grid-only single-page PDFs, keyed by page size, reused for every page that size
+_grid_cache: dict[tuple[float, float], bytes] = {}
+
+# Helvetica under a different resource name than the "helv" used for the page
+# text: PyMuPDF would otherwise see "helv" in the stamped grid and not add it
+# to the page's own fonts
+GRID_FONT = "helvetica"
+
+
+def _grid_template(width: float, height: float) -> bytes:
+    """Return a one-page PDF holding just the coordinate grid for this page size."""
+    key = (width, height)
+    if key in _grid_cache:
+        return _grid_cache[key]
+    
+    doc = fitz.open()
+    page = doc.new_page(width=width, height=height)
+    
+    # Two shapes per page, each committed once: grid lines, then the axis
+    # label backgrounds and all labels. Note that a shape emits all of its
+    # text after all of its drawings.
+    grid = page.new_shape()
+    labels = page.new_shape()
+    
+    # Grid ticks: major ticks get labels, minor ticks are the in-between lines
+    major_xs = range(0, int(width) + 1, MAJOR_GRID_SPACING)
+    major_ys = range(0, int(height) + 1, MAJOR_GRID_SPACING)
+    minor_xs = sorted(set(range(0, int(width) + 1, GRID_SPACING)) - set(major_xs))
+    minor_ys = sorted(set(range(0, int(height) + 1, GRID_SPACING)) - set(major_ys))
+    
+    # Draw minor grid lines (vertical, then horizontal), finished together
+    for x in minor_xs:
+        grid.draw_line(fitz.Point(x, 0), fitz.Point(x, height))
+    for y in minor_ys:
+        grid.draw_line(fitz.Point(0, y), fitz.Point(width, y))
+    grid.finish(color=(0.8, 0.8, 0.8), width=0.25)
+    
+    # Columns: major line, X-axis label (with background for visibility)
+    # and the coordinate labels down that column
+    # PDF-native: origin at top-left, Y increases downward
+    for x in major_xs:
+        grid.draw_line(fitz.Point(x, 0), fitz.Point(x, height))
+        labels.draw_rect(fitz.Rect(x, 0, x + 25, 12))
+        
+        # The origin corner is labelled by the Y axis, and intersections on
+        # the top/left edges would sit under the axis label backgrounds
+        if not x:
+            continue
+        labels.insert_text(
+            fitz.Point(x + 2, 10),
+            str(x),
+            fontsize=8,
+            color=(0, 0, 0.8),  # Blue
+            fontname=GRID_FONT,
+        )
+        for y in major_ys[1:]:
+            labels.insert_text(
+                fitz.Point(x + 2, y + FONT_SIZE + 2),
+                f"({x},{y})",
+                fontsize=FONT_SIZE,
+                color=(1, 0, 0),  # Red
+                fontname=GRID_FONT,
+            )
+    
+    # Rows: major line and Y-axis label (with background for visibility)
+    for y in major_ys:
+        grid.draw_line(fitz.Point(0, y), fitz.Point(width, y))
+        labels.draw_rect(fitz.Rect(0, y, 30, y + 12))
+        labels.insert_text(
+            fitz.Point(2, y + 10),
+            str(y),
+            fontsize=8,
+            color=(0, 0, 0.8),  # Blue
+            fontname=GRID_FONT,
+        )
+    
+    grid.finish(color=(0.5, 0.5, 0.5), width=0.5)
+    labels.finish(color=(0.8, 0.8, 1), fill=(1, 1, 1), width=0.3)
+    grid.commit()
+    labels.commit()
+    
+    _grid_cache[key] = doc.tobytes()
+    doc.close()
+    return _grid_cache[key]
+
+
 def add_coordinate_grid(input_pdf: str):
     """Add coordinate grid to PDF using PDF-native coordinates (origin at top-left)."""
     
@@ -24,98 +110,18 @@ def add_coordinate_grid(input_pdf: str):
     output_pdf = str(input_path.parent / f"{input_path.stem}_with_coordinates.pdf")
     
     doc = fitz.open(input_pdf)
+    templates = {}  # Opened grid templates, by page size
     
     for page_num in range(len(doc)):
         page = doc[page_num]
         width = page.rect.width
         height = page.rect.height
         
-        shape = page.new_shape()
-        
-        # Draw vertical grid lines
-        x = 0
-        while x <= width:
-            is_major = (x % MAJOR_GRID_SPACING == 0)
-            color = (0.5, 0.5, 0.5) if is_major else (0.8, 0.8, 0.8)
-            line_width = 0.5 if is_major else 0.25
-            shape.draw_line(fitz.Point(x, 0), fitz.Point(x, height))
-            shape.finish(color=color, width=line_width)
-            x += GRID_SPACING
-        
-        # Draw horizontal grid lines
-        y = 0
-        while y <= height:
-            is_major = (y % MAJOR_GRID_SPACING == 0)
-            color = (0.5, 0.5, 0.5) if is_major else (0.8, 0.8, 0.8)
-            line_width = 0.5 if is_major else 0.25
-            shape.draw_line(fitz.Point(0, y), fitz.Point(width, y))
-            shape.finish(color=color, width=line_width)
-            y += GRID_SPACING
-        
-        shape.commit()
-        
-        # Add coordinate labels at major grid intersections
-        # PDF-native: origin at top-left, Y increases downward
-        x = 0
-        while x <= width:
-            y = 0
-            while y <= height:
-                # Only label at major grid intersections
-                if x % MAJOR_GRID_SPACING == 0 and y % MAJOR_GRID_SPACING == 0:
-                    coord_text = f"({int(x)},{int(y)})"
-                    text_point = fitz.Point(x + 2, y + FONT_SIZE + 2)
-                    
-                    page.insert_text(
-                        text_point,
-                        coord_text,
-                        fontsize=FONT_SIZE,
-                        color=(1, 0, 0),  # Red
-                        fontname="helv",
-                    )
-                
-                y += GRID_SPACING
-            x += GRID_SPACING
-        
-        # Add X-axis labels along the top edge (with background for visibility)
-        x = 0
-        while x <= width:
-            if x % MAJOR_GRID_SPACING == 0:
-                # Draw a small white background rectangle for readability
-                label_rect = fitz.Rect(x, 0, x + 25, 12)
-                shape = page.new_shape()
-                shape.draw_rect(label_rect)
-                shape.finish(color=(0.8, 0.8, 1), fill=(1, 1, 1), width=0.3)
-                shape.commit()
-                
-                page.insert_text(
-                    fitz.Point(x + 2, 10),
-                    str(int(x)),
-                    fontsize=8,
-                    color=(0, 0, 0.8),  # Blue
-                    fontname="helv",
-                )
-            x += MAJOR_GRID_SPACING
-        
-        # Add Y-axis labels along the left edge (with background for visibility)
-        y = 0
-        while y <= height:
-            if y % MAJOR_GRID_SPACING == 0:
-                # Draw a small white background rectangle for readability
-                label_rect = fitz.Rect(0, y, 30, y + 12)
-                shape = page.new_shape()
-                shape.draw_rect(label_rect)
-                shape.finish(color=(0.8, 0.8, 1), fill=(1, 1, 1), width=0.3)
-                shape.commit()
-                
-                # Add the Y label
-                page.insert_text(
-                    fitz.Point(2, y + 10),
-                    str(int(y)),
-                    fontsize=8,
-                    color=(0, 0, 0.8),  # Blue
-                    fontname="helv",
-                )
-            y += MAJOR_GRID_SPACING
+        # Stamp the (cached) grid for this page size onto the page
+        key = (width, height)
+        if key not in templates:
+            templates[key] = fitz.open("pdf", _grid_template(width, height))
+        page.show_pdf_page(page.rect, templates[key], 0)
         
         # Add page info
         page.insert_text(
@@ -1,38 +1,191 @@
 """
 Flask backend for Bank Form Assistant
 """
+import io
 import os
-import json
+import asyncio
+import time
+import uuid
+import queue
+import hashlib
+import functools
+import threading
 import shutil
-import tempfile
 import subprocess
+from concurrent.futures import Future
 
+import httpx
 import numpy as np
-from scipy.io import wavfile
-from flask import Flask, render_template, request, jsonify, send_file
-from openai import OpenAI
+import orjson
+import redis
+from flask import Flask, render_template, request, jsonify, send_file, abort
+from werkzeug.security import safe_join
+from flask.json.provider import JSONProvider
+from openai import AsyncOpenAI
 from datetime import datetime
 from dotenv import load_dotenv
 
 from chatbot import (
     load_available_forms,
+    load_catalog,
     load_form_coordinates,
     get_all_forms_flat,
     get_form_details,
     load_form_fields,
     build_form_finder_prompt,
-    build_system_prompt as build_form_filling_prompt
+    build_system_prompt as build_form_filling_prompt,
+    is_field_visible,
+    unpack_extracted_fields,
+    DETECTION_SCHEMA,
+    FILLING_SCHEMA,
+    FALLBACK_MESSAGE
 )
-from voice_input import transcribe as whisper_transcribe, SAMPLE_RATE as WHISPER_SR
+from voice_input import transcribe_batch as whisper_transcribe_batch, warmup as whisper_warmup, SAMPLE_RATE as WHISPER_SR
 
 load_dotenv()
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (used by request.json and jsonify)."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+app.json = OrjsonProvider(app)
+GENERATED_DIR = os.path.join(app.root_path, "forms")  # Filled PDFs are written next to the blanks
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = "gpt-4o-mini"
 
-# Store active sessions (in production, use Redis or database)
-sessions = {}
+# Structured-output formats (Responses API flavour) for the two chat phases
+DETECTION_FORMAT = {"type": "json_schema", "name": "form_detection", "schema": DETECTION_SCHEMA, "strict": True}
+FILLING_FORMAT = {"type": "json_schema", "name": "form_filling", "schema": FILLING_SCHEMA, "strict": True}
+
+# Returned when the model refuses or its reply is cut off, even after a retry;
+# valid for both formats and changes nothing
+FALLBACK_REPLY = {
+    "message": FALLBACK_MESSAGE,
+    "form_name": None,
+    "bank": None,
+    "confidence": "low",
+    "end_conversation": False,
+    "extracted_fields": {},
+    "ready_to_generate": False
+}
+
+# Active sessions live in Redis so any worker/instance can serve them and
+# abandoned ones expire on their own
+redis_client = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+SESSION_TTL = 3600  # seconds, refreshed on every write
+
+
+def load_session(session_id):
+    """Load a session from Redis (None if unknown or expired)."""
+    if not session_id:
+        return None
+    blob = redis_client.get(f"sess:{session_id}")
+    return orjson.loads(blob) if blob else None
+
+
+def save_session(session_id, session):
+    """Store a session in Redis and reset its expiry."""
+    redis_client.set(f"sess:{session_id}", orjson.dumps(session), ex=SESSION_TTL)
+
+
+# Flask runs every async view in its own short-lived event loop, which an async
+# client can't be shared across. Model calls are instead handed to one
+# long-lived loop thread that owns the client, so every request reuses its
+# keep-alive connection pool and concurrent calls are multiplexed there.
+llm_loop = asyncio.new_event_loop()
+threading.Thread(target=llm_loop.run_forever, name="llm-loop", daemon=True).start()
+llm_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+)
+
+
+async def ask_model(session, system_prompt, user_message, text_format):
+    """Send one user turn via the Responses API and return the parsed JSON reply.
+    
+    Prior turns are kept server-side and chained with previous_response_id, so
+    only the system prompt and the new message are sent each time.
+    """
+    for _ in range(2):  # one retry
+        call = llm_client.responses.create(
+            model=MODEL,
+            instructions=system_prompt,
+            input=user_message,
+            previous_response_id=session.get("prev_response_id"),
+            text={"format": text_format},
+            temperature=0.4
+        )
+        response = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(call, llm_loop))
+        # The schema only guarantees valid JSON for completed, unrefused output
+        if response.status == "completed" and not is_refusal(response):
+            session["prev_response_id"] = response.id
+            return unpack_extracted_fields(orjson.loads(response.output_text))
+    # Leave prev_response_id alone so the next turn doesn't build on this one
+    return FALLBACK_REPLY
+
+
+def is_refusal(response):
+    """True if the model declined to answer instead of producing the JSON reply."""
+    return any(
+        part.type == "refusal"
+        for item in response.output if item.type == "message"
+        for part in item.content
+    )
+
+
+CATALOG_PATH = "available_forms.json"
+
+
+def get_forms_payload():
+    """Serialized form catalog and its ETag, rebuilt when the catalog file changes."""
+    return _forms_payload(os.stat(CATALOG_PATH).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=1)
+def _forms_payload(mtime_ns):
+    body = orjson.dumps(load_available_forms(CATALOG_PATH))
+    return body, hashlib.md5(body).hexdigest()
+
+
+def get_finder_prompt():
+    """Form detection prompt, rebuilt when the catalog file changes."""
+    return _finder_prompt(os.stat(CATALOG_PATH).st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=1)
+def _finder_prompt(mtime_ns):
+    available_forms, _, forms_json = load_catalog(CATALOG_PATH)
+    return build_form_finder_prompt(available_forms, forms_json)
+
+
+def enter_filling_phase(session, form_name, bank_name, form_fields, coordinates_file):
+    """Switch a session to the filling phase and set up its per-form state."""
+    session["phase"] = "filling"
+    session["form_name"] = form_name
+    session["bank_name"] = bank_name
+    session["form_fields"] = form_fields
+    session["coordinates_file"] = coordinates_file
+    session["copy_from_fields"] = [f.get("field") for f in form_fields if f.get("copy_from")]
+    # Fields the user still has to provide, in form order; trimmed as values
+    # arrive so turns never rescan form_fields (show_when is checked on read)
+    session["unfilled_fields"] = [
+        {k: f[k] for k in ("field", "show_when") if k in f}
+        for f in form_fields
+        if not f.get("value") and not session["field_values"].get(f.get("field")) and not f.get("copy_from")
+    ]
+    session["prev_response_id"] = None  # Chat history restarts for the filling phase
 
 
 # Routes
@@ -44,42 +197,45 @@ def index():
 @app.route('/api/forms')
 def get_forms():
     """Get all available forms grouped by bank."""
-    available_forms = load_available_forms()
-    return jsonify(available_forms)
+    body, etag = get_forms_payload()
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)  # 304 on a matching If-None-Match
 
 
 @app.route('/api/session/start', methods=['POST'])
 def start_session():
     """Start a new chat session."""
-    session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-    available_forms = load_available_forms()
+    session_id = uuid.uuid4().hex
     
-    sessions[session_id] = {
+    session = {
         "phase": "detection",  # detection or filling
-        "conversation_history": [],
-        "available_forms": available_forms,
+        "prev_response_id": None,  # Last Responses API turn (history is server-side)
         "form_name": None,
         "bank_name": None,
         "field_values": {},
         "form_fields": []
     }
+    save_session(session_id, session)
     
     return jsonify({"session_id": session_id})
 
 
 @app.route('/api/session/select-form', methods=['POST'])
-def select_form():
+async def select_form():
     """Directly select a form (skip detection phase)."""
     data = request.json
     session_id = data.get("session_id")
     form_name = data.get("form_name")
     bank_name = data.get("bank_name")
     
-    if session_id not in sessions:
+    session = load_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session"}), 400
     
-    session = sessions[session_id]
-    available_forms = session["available_forms"]
+    available_forms = load_available_forms(CATALOG_PATH)
     
     # Get form details
     form_details = get_form_details(available_forms, form_name, bank_name)
@@ -93,66 +249,25 @@ def select_form():
     if not form_fields:
         return jsonify({"error": "Could not load form fields"}), 500
     
-    # Update session
-    session["phase"] = "filling"
-    session["form_name"] = form_name
-    session["bank_name"] = bank_name
-    session["form_fields"] = form_fields
-    session["coordinates_file"] = coordinates_file
-    session["conversation_history"] = []
-    
     # Pre-fill values from form_fields (if any have default values)
     for field in form_fields:
         if field.get("value"):
             session["field_values"][field.get("field")] = field.get("value")
     
+    # Update session
+    enter_filling_phase(session, form_name, bank_name, form_fields, coordinates_file)
+    
     # Generate initial message (skip pre-filled fields)
-    system_prompt = build_form_filling_prompt(form_fields, session["field_values"])
-    
-    # Build initial context with unfilled fields (same filtering as handle_filling_chat)
-    copy_from_fields = {f.get("field") for f in form_fields if f.get("copy_from")}
-    init_unfilled = []
-    for f in form_fields:
-        fn = f.get("field")
-        if session["field_values"].get(fn):
-            continue
-        if fn in copy_from_fields:
-            continue
-        show_when = f.get("show_when")
-        if show_when:
-            parent_val = session["field_values"].get(show_when.get("field"), "")
-            if parent_val != show_when.get("equals"):
-                continue
-        init_unfilled.append(fn)
-    
-    visible_filled = {k: v for k, v in session['field_values'].items() if k not in copy_from_fields}
     today = datetime.now().strftime("%d%m%Y")
-    init_context = f"\n\n[Context: Today={today}. Filled={visible_filled}. Still needed={init_unfilled}]"
-    init_user_msg = f"I want to fill the {form_name} form. What information do you need?" + init_context
-    
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": init_user_msg}
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.4
-    )
+    # Memoized in-process across sessions, so nothing needs storing in the session
+    system_prompt = build_form_filling_prompt(session["form_fields"], session["field_values"], today=today)
+    init_user_msg = f"I want to fill the {form_name} form. What information do you need?"
     
-    result = json.loads(response.choices[0].message.content)
-    
-    session["conversation_history"].append({
-        "role": "user",
-        "content": init_user_msg
-    })
-    session["conversation_history"].append({
-        "role": "assistant",
-        "content": response.choices[0].message.content
-    })
+    result = await ask_model(session, system_prompt, init_user_msg, FILLING_FORMAT)
+    save_session(session_id, session)
     
     return jsonify({
-        "message": result.get("message"),
+        "message": result["message"],
         "form_name": form_name,
         "bank_name": bank_name,
         "phase": "filling"
@@ -160,64 +275,44 @@ def select_form():
 
 
 @app.route('/api/chat', methods=['POST'])
-def chat():
+async def chat():
     """Handle chat message."""
     data = request.json
     session_id = data.get("session_id")
     user_message = data.get("message", "").strip()
     
-    if session_id not in sessions:
+    session = load_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session"}), 400
     
     if not user_message:
         return jsonify({"error": "Empty message"}), 400
     
-    session = sessions[session_id]
-    
     if session["phase"] == "detection":
-        return handle_detection_chat(session, user_message)
+        response = await handle_detection_chat(session, user_message)
     else:
-        return handle_filling_chat(session, user_message)
+        response = await handle_filling_chat(session, user_message)
+    
+    save_session(session_id, session)
+    return response
 
 
-def handle_detection_chat(session, user_message):
+async def handle_detection_chat(session, user_message):
     """Handle chat during form detection phase."""
-    available_forms = session["available_forms"]
-    system_prompt = build_form_finder_prompt(available_forms)
-    
-    session["conversation_history"].append({
-        "role": "user",
-        "content": user_message
-    })
-    
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            *session["conversation_history"]
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.4
-    )
-    
-    assistant_msg = response.choices[0].message.content
-    session["conversation_history"].append({
-        "role": "assistant",
-        "content": assistant_msg
-    })
+    available_forms = load_available_forms(CATALOG_PATH)
+    system_prompt = get_finder_prompt()
     
-    result = json.loads(assistant_msg)
+    result = await ask_model(session, system_prompt, user_message, DETECTION_FORMAT)
     
     response_data = {
-        "message": result.get("message"),
+        "message": result["message"],
         "phase": "detection",
-        "end_conversation": result.get("end_conversation", False)
+        "end_conversation": result["end_conversation"]
     }
     
-    # Check if form was identified
-    if result.get("form_name") and result.get("confidence") in ["high", "medium"]:
-        form_name = result.get("form_name")
-        bank_name = result.get("bank")
+    # Check if form was identified (the strict schema guarantees every key)
+    form_name, bank_name = result["form_name"], result["bank"]
+    if form_name and result["confidence"] in ["high", "medium"]:
         
         # Load form details and transition to filling phase
         form_details = get_form_details(available_forms, form_name, bank_name)
@@ -226,12 +321,7 @@ def handle_detection_chat(session, user_message):
             form_fields = load_form_fields(coordinates_file, form_name)
             
             if form_fields:
-                session["phase"] = "filling"
-                session["form_name"] = form_name
-                session["bank_name"] = bank_name
-                session["form_fields"] = form_fields
-                session["coordinates_file"] = coordinates_file
-                session["conversation_history"] = []  # Reset for filling phase
+                enter_filling_phase(session, form_name, bank_name, form_fields, coordinates_file)
                 
                 response_data["phase"] = "filling"
                 response_data["form_name"] = form_name
@@ -240,73 +330,36 @@ def handle_detection_chat(session, user_message):
     return jsonify(response_data)
 
 
-def handle_filling_chat(session, user_message):
+async def handle_filling_chat(session, user_message):
     """Handle chat during form filling phase."""
-    form_fields = session["form_fields"]
-    field_values = session["field_values"]
-    
-    # Build set of copy_from field names — these are invisible to the LLM
-    copy_from_fields = {f.get("field") for f in form_fields if f.get("copy_from")}
-    
-    # Get unfilled fields (skip copy_from and hidden show_when fields)
-    unfilled = []
-    for f in form_fields:
-        field_name = f.get("field")
-        if field_values.get(field_name):
-            continue
-        if field_name in copy_from_fields:
-            continue
-        # Skip fields whose show_when condition is not met
-        show_when = f.get("show_when")
-        if show_when:
-            parent_val = field_values.get(show_when.get("field"), "")
-            if parent_val != show_when.get("equals"):
-                continue
-        unfilled.append(field_name)
-    
-    # Filter Filled dict to exclude copy_from fields so LLM never sees those names
-    visible_filled = {k: v for k, v in field_values.items() if k not in copy_from_fields}
+    # copy_from field names (collected at phase transition) are invisible to the LLM
+    copy_from_fields = session["copy_from_fields"]
     
+    # Prompt reflects the current filled values so it only shows unfilled fields
+    # (filled/unfilled state lives here, not in the user messages)
     today = datetime.now().strftime("%d%m%Y")
-    context = f"\n\n[Context: Today={today}. Filled={visible_filled}. Still needed={unfilled}]"
+    system_prompt = build_form_filling_prompt(session["form_fields"], session["field_values"], today=today)
     
-    session["conversation_history"].append({
-        "role": "user",
-        "content": user_message + context
-    })
-    
-    # Rebuild prompt with current filled values so it only shows unfilled fields
-    system_prompt = build_form_filling_prompt(form_fields, field_values)
-    
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            *session["conversation_history"]
-        ],
-        response_format={"type": "json_object"},
-        temperature=0.4
-    )
-    
-    assistant_msg = response.choices[0].message.content
-    session["conversation_history"].append({
-        "role": "assistant",
-        "content": assistant_msg
-    })
-    
-    result = json.loads(assistant_msg)
+    result = await ask_model(session, system_prompt, user_message, FILLING_FORMAT)
     
     # Update field values (ignore copy_from fields — they are auto-filled at PDF generation)
-    for field, value in result.get("extracted_fields", {}).items():
+    newly_filled = set()
+    for field, value in result["extracted_fields"].items():
         if value and field not in copy_from_fields:
             session["field_values"][field] = value
+            newly_filled.add(field)
+    if newly_filled:
+        session["unfilled_fields"] = [f for f in session["unfilled_fields"] if f["field"] not in newly_filled]
     
     response_data = {
-        "message": result.get("message"),
+        "message": result["message"],
         "phase": "filling",
         "form_name": session["form_name"],
         "field_values": session["field_values"],
-        "ready_to_generate": result.get("ready_to_generate", False)
+        "missing_fields": [
+            f["field"] for f in session["unfilled_fields"] if is_field_visible(f, session["field_values"])
+        ],
+        "ready_to_generate": result["ready_to_generate"]
     }
     
     return jsonify(response_data)
@@ -318,11 +371,10 @@ def generate_pdf():
     data = request.json
     session_id = data.get("session_id")
     
-    if session_id not in sessions:
+    session = load_session(session_id)
+    if session is None:
         return jsonify({"error": "Invalid session"}), 400
     
-    session = sessions[session_id]
-    
     if session["phase"] != "filling":
         return jsonify({"error": "Form not selected yet"}), 400
     
@@ -351,24 +403,101 @@ def generate_pdf():
 @app.route('/api/download/<path:filename>')
 def download_file(filename):
     """Download generated PDF."""
-    return send_file(filename, as_attachment=True)
+    # filename is relative to the app root (e.g. forms/Pay-in-Slip_filled.pdf),
+    # but only files inside GENERATED_DIR may be served
+    safe_path = safe_join(app.root_path, filename)
+    if safe_path is None or os.path.dirname(safe_path) != GENERATED_DIR or not os.path.isfile(safe_path):
+        abort(404)
+    # Regenerating overwrites the same file, so don't let browsers cache it
+    # blindly: they revalidate via ETag/Last-Modified and get a 304 if unchanged
+    return send_file(safe_path, as_attachment=True, conditional=True)
 
 
-# ---- Voice transcription (ffmpeg + local Whisper) ----
+# ---- Voice transcription (PyAV/ffmpeg + local Whisper) ----
+
+try:
+    import av  # In-process libavcodec decoding (no ffmpeg subprocess)
+except ImportError:
+    av = None
 
 FFMPEG_PATH = shutil.which("ffmpeg") or r"C:\Users\Abhinand\AppData\Local\Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0.1-full_build\bin\ffmpeg.exe"
 
 
-def convert_to_wav(input_path, output_path):
-    """Convert any audio file (webm/ogg/etc.) to 16 kHz mono WAV using ffmpeg."""
+def decode_audio(data):
+    """Decode browser audio (webm/ogg/etc.) to 16 kHz mono int16 samples."""
+    if av is not None:
+        return decode_audio_av(data)
+    return decode_audio_ffmpeg(data)
+
+
+def decode_audio_av(data):
+    """Decode and resample in-process with PyAV."""
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=WHISPER_SR)
+    chunks = []
+    with av.open(io.BytesIO(data)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                chunks.append(np.frombuffer(out.planes[0], dtype=np.int16)[:out.samples])
+    for out in resampler.resample(None):  # Flush buffered samples
+        chunks.append(np.frombuffer(out.planes[0], dtype=np.int16)[:out.samples])
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int16)
+
+
+def decode_audio_ffmpeg(data):
+    """Decode by piping through an ffmpeg subprocess (fallback when PyAV is missing)."""
     result = subprocess.run(
-        [FFMPEG_PATH, '-y', '-i', input_path,
-         '-ar', str(WHISPER_SR), '-ac', '1', '-sample_fmt', 's16',
-         output_path],
-        capture_output=True, text=True
+        [FFMPEG_PATH, '-i', 'pipe:0',
+         '-ar', str(WHISPER_SR), '-ac', '1', '-f', 's16le',
+         'pipe:1'],
+        input=data, capture_output=True
     )
     if result.returncode != 0:
-        raise RuntimeError(f"ffmpeg conversion failed: {result.stderr[:200]}")
+        raise RuntimeError(f"ffmpeg conversion failed: {result.stderr[:200].decode(errors='replace')}")
+    # Raw s16le output has no header to parse
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+# A single worker thread owns the Whisper model; requests arriving within
+# STT_BATCH_WINDOW of each other are transcribed in one batch
+STT_BATCH_WINDOW = 0.02  # seconds
+STT_MAX_BATCH = 8
+STT_RESULT_TIMEOUT = 120  # seconds a request waits for its transcription
+stt_queue = queue.Queue()
+
+
+def stt_worker():
+    """Serve queued (audio, future) transcription requests in small batches."""
+    # Requests queued during warmup simply wait for it instead of paying it themselves
+    try:
+        whisper_warmup()
+    except Exception:
+        # Keep serving: the model load is retried by the first real batch,
+        # whose requests then get the error through their futures
+        import traceback
+        traceback.print_exc()
+    while True:
+        batch = [stt_queue.get()]
+        deadline = time.monotonic() + STT_BATCH_WINDOW
+        while len(batch) < STT_MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(stt_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        try:
+            texts = whisper_transcribe_batch([audio for audio, _ in batch], WHISPER_SR)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+
+threading.Thread(target=stt_worker, name="stt-worker", daemon=True).start()
 
 
 @app.route('/api/transcribe', methods=['POST'])
@@ -377,25 +506,22 @@ def transcribe_audio():
     if 'audio' not in request.files:
         return jsonify({"error": "No audio file"}), 400
 
-    audio_file = request.files['audio']
-    temp_src = os.path.join(tempfile.gettempdir(), 'bfa_upload')
-    temp_wav = os.path.join(tempfile.gettempdir(), 'bfa_rec.wav')
+    data = request.files['audio'].read()
+    if len(data) < 200:
+        return jsonify({"error": "Empty recording"}), 400
 
     try:
-        audio_file.save(temp_src)
-        if os.path.getsize(temp_src) < 200:
-            return jsonify({"error": "Empty recording"}), 400
-
-        # Convert browser audio (webm) → 16 kHz mono WAV
-        convert_to_wav(temp_src, temp_wav)
-
-        # Read WAV into float32 numpy array
-        sr, raw = wavfile.read(temp_wav)
-        audio_np = raw.astype(np.float32) / 32768.0
+        # Decode browser audio (webm) → 16 kHz mono float32 numpy array
+        raw = decode_audio(data)
+        # Cast and scale in one pass (multiply by the reciprocal, no temp copy)
+        audio_np = np.multiply(raw, np.float32(1.0 / 32768.0), dtype=np.float32)
+        sr = WHISPER_SR
         print(f"[STT] {len(audio_np)/sr:.1f}s, peak={np.max(np.abs(audio_np)):.3f}")
 
-        # Transcribe
-        text = whisper_transcribe(audio_np, sr)
+        # Transcribe (queued for the Whisper worker)
+        future = Future()
+        stt_queue.put((audio_np, future))
+        text = future.result(timeout=STT_RESULT_TIMEOUT)
         print(f"[STT] result: '{text}'")
 
         return jsonify({"text": text, "success": True})
@@ -405,13 +531,6 @@ def transcribe_audio():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        for p in (temp_src, temp_wav):
-            try:
-                os.unlink(p)
-            except OSError:
-                pass
-
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000, use_reloader=False)
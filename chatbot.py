@@ -1,15 +1,278 @@
 import os
+import re
 import json
-from openai import OpenAI
+import asyncio
+import threading
+import functools
+import numpy as np
 from datetime import datetime
-from dotenv import load_dotenv
 
-load_dotenv()  
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+try:
+    import re2 as _re_engine  # DFA-based matching for the field validators
+except ImportError:
+    _re_engine = re
+
+try:
+    import tiktoken  # Exact token counts for the history budget
+except ImportError:
+    tiktoken = None
+
+_client = None
+_client_build = None
+
+
+def _build_client():
+    """Import openai/httpx/dotenv and build the client (a few hundred ms, so done lazily)."""
+    import httpx
+    from openai import AsyncOpenAI
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    # Pooled HTTP/2 transport, so calls that overlap (completions, embeddings,
+    # history summaries) share one connection and TLS session
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+    )
+
+
+async def get_client():
+    """Shared OpenAI client, built on first use in a worker thread."""
+    global _client, _client_build
+    if _client is None:
+        # Callers arriving while the build is running wait on the same one
+        if _client_build is None:
+            _client_build = asyncio.ensure_future(asyncio.to_thread(_build_client))
+        _client = await _client_build
+    return _client
+
+
+class MessageStreamExtractor:
+    """Pull the decoded "message" string out of a JSON reply as it streams in."""
+    
+    _START = re.compile(r'"message"\s*:\s*"')
+    
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None  # buffer index of the next undecoded character of the value
+        self.done = False
+    
+    def feed(self, chunk):
+        """Add a chunk of the reply; return the newly completed part of the message."""
+        self.buffer += chunk
+        if self.done:
+            return ""
+        if self.pos is None:
+            match = self._START.search(self.buffer)
+            if not match:
+                return ""
+            self.pos = match.end()
+        
+        # Advance over whole characters/escapes only; a split escape waits for the next chunk
+        buf, end = self.buffer, self.pos
+        while end < len(buf):
+            c = buf[end]
+            if c == '"':
+                self.done = True
+                break
+            if c != '\\':
+                end += 1
+            elif end + 1 >= len(buf):
+                break
+            elif buf[end + 1] != 'u':
+                end += 2
+            elif end + 6 > len(buf):
+                break
+            elif 0xD800 <= int(buf[end + 2:end + 6], 16) <= 0xDBFF:
+                # High surrogate: decode it together with its low half
+                if end + 12 > len(buf):
+                    break
+                end += 12
+            else:
+                end += 6
+        
+        text = json.loads('"' + buf[self.pos:end] + '"')
+        self.pos = end
+        return text
+
+
+async def complete(on_text=None, **kwargs):
+    """Run a chat completion and return its content.
+    
+    With `on_text`, the reply is streamed and the text of its "message"
+    field is passed to `on_text` piece by piece as it arrives.
+    
+    A strict schema only guarantees JSON for replies that finish: a refusal
+    or a reply cut off at the token limit is retried once, and None is
+    returned if that fails too.
+    """
+    streamed = []
+    
+    def relay(text):
+        streamed.append(text)
+        on_text(text)
+    
+    for _ in range(2):
+        # Don't stream the retry over text the first attempt already showed
+        content = await _complete_once(relay if on_text and not streamed else None, **kwargs)
+        if content is not None:
+            return content
+    return None
+
+
+async def _complete_once(on_text=None, **kwargs):
+    """One completion attempt; None if it was refused or didn't finish."""
+    client = await get_client()
+    if on_text is None:
+        response = await client.chat.completions.create(**kwargs)
+        choice = response.choices[0]
+        if choice.finish_reason != "stop" or getattr(choice.message, "refusal", None):
+            return None
+        return choice.message.content
+    
+    extractor = MessageStreamExtractor()
+    parts = []
+    finish_reason = refused = None
+    stream = await client.chat.completions.create(stream=True, **kwargs)
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        finish_reason = choice.finish_reason or finish_reason
+        refused = refused or getattr(choice.delta, "refusal", None)
+        delta = choice.delta.content
+        if delta:
+            parts.append(delta)
+            text = extractor.feed(delta)
+            if text:
+                on_text(text)
+    if finish_reason != "stop" or refused:
+        return None
+    return "".join(parts)
+
 
 MODEL = "gpt-4o-mini"
 
+# Shown when the model refuses or its reply is cut off, even after a retry
+FALLBACK_MESSAGE = "Sorry, I couldn't process that. Could you say it another way?"
+
+# Paraphrases of an earlier question ("what's left?" / "which fields remain?")
+# asked in the same field state reuse that earlier reply
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_WORDS = 8  # longer messages, or any with digits, carry values: not looked up
+
+# Formats a bare user reply must match to be taken as that field's value
+# without asking the model (see FormAssistant._try_local_resolve). Compiled
+# once; google-re2 (linear-time, no backtracking) is used when installed.
+_FIELD_VALIDATORS = {
+    "IFSC Code": _re_engine.compile(r"^[A-Z]{4}0[A-Z0-9]{6}$"),
+    "Account Number": _re_engine.compile(r"^\d{7,12}$"),
+    "Aadhar Number": _re_engine.compile(r"^\d{12}$"),
+    "Date": _re_engine.compile(r"^\d{8}$"),
+    "Amount": _re_engine.compile(r"^\d+(?:\.\d{1,2})?$")
+}
+
+
+def validate_field(name, value):
+    """False only if the field has a known format and value doesn't match it."""
+    validator = _FIELD_VALIDATORS.get(name)
+    return validator is None or validator.match(value) is not None
+
+
+CONFIRM_WORDS = {"yes", "y", "confirm", "ok", "okay", "correct"}
+# "change <field> to <value>"; the field part is matched against the form's
+# own field names (see FormAssistant._change_patterns), since names like
+# "Credit To" contain " to " themselves
+CHANGE_RE = re.compile(r"(?:change|set|update)\s+(?:the\s+)?(.+)", re.IGNORECASE)
+
+# Per-turn state sent after the user's message. "Still needed" is left out:
+# it is the system prompt's field list minus Filled.
+CONTEXT_TEMPLATE = "[Context: Today={today}. Filled={filled}]"
+
+# Once the filling history passes HISTORY_TOKEN_BUDGET tokens, all but the
+# last HISTORY_KEEP_TURNS exchanges are folded into a running summary (at most
+# once every SUMMARY_EVERY_TURNS turns, so the cached prefix stays put meanwhile)
+HISTORY_TOKEN_BUDGET = 2000
+HISTORY_KEEP_TURNS = 3
+SUMMARY_EVERY_TURNS = 6
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    return tiktoken.encoding_for_model(MODEL)
+
+
+def count_tokens(text):
+    """Token count for MODEL (roughly 4 chars per token without tiktoken)."""
+    if tiktoken is None:
+        return len(text) // 4
+    return len(_get_encoding().encode(text))
+
+
+# Structured-output schemas for the model's replies. Strict mode needs every
+# property required and no open-ended objects, hence the field/value list.
+DETECTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string", "description": "Your conversational response to the user"},
+        "form_name": {"type": ["string", "null"], "description": "Exact form_name from the list if identified, otherwise null"},
+        "bank": {"type": ["string", "null"], "description": "Bank name if form identified, otherwise null"},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+        "end_conversation": {"type": "boolean"}
+    },
+    "required": ["message", "form_name", "bank", "confidence", "end_conversation"],
+    "additionalProperties": False
+}
+
+FILLING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string", "description": "Your conversational response"},
+        "extracted_fields": {
+            "type": "array",
+            "description": "Every field value found in the user's message",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "field": {"type": "string"},
+                    "value": {"type": "string"}
+                },
+                "required": ["field", "value"],
+                "additionalProperties": False
+            }
+        },
+        "ready_to_generate": {"type": "boolean"}
+    },
+    "required": ["message", "extracted_fields", "ready_to_generate"],
+    "additionalProperties": False
+}
+
+
+# CLI detection replies also carry the first batch of field values, so the
+# form filling can start in the same turn the form is identified
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **DETECTION_SCHEMA["properties"],
+        "extracted_fields": FILLING_SCHEMA["properties"]["extracted_fields"]
+    },
+    "required": [*DETECTION_SCHEMA["required"], "extracted_fields"],
+    "additionalProperties": False
+}
+
+
+def unpack_extracted_fields(result):
+    """Turn a reply's [{field, value}, ...] list into a {field: value} dict (in place)."""
+    if "extracted_fields" in result:
+        result["extracted_fields"] = {f["field"]: f["value"] for f in result["extracted_fields"]}
+    return result
+
 
 def is_field_visible(field, filled_values):
     """Check if a field should be shown based on its show_when condition."""
@@ -22,33 +285,58 @@ def is_field_visible(field, filled_values):
     return actual_value == expected_value
 
 
-def build_system_prompt(form_fields, filled_values=None):
-    """Build system prompt dynamically based on form fields."""
-    filled_values = filled_values or {}
+def _freeze_fields(form_fields):
+    """Hashable view of the field attributes build_system_prompt reads."""
+    return tuple(
+        (
+            f.get("field"),
+            f.get("description", ""),
+            f.get("type"),
+            tuple(f.get("options", {})),
+            bool(f.get("value")),
+            bool(f.get("copy_from")),
+            (f["show_when"].get("field"), f["show_when"].get("equals")) if f.get("show_when") else None
+        )
+        for f in form_fields
+    )
+
+
+def build_system_prompt(form_fields, filled_values=None, today=None):
+    """Build system prompt dynamically based on form fields.
+    
+    If `today` (DDMMYYYY) is given it is stated in the prompt, so callers
+    don't need to repeat it in every user message. Identical inputs share
+    one cached prompt string across sessions.
+    """
+    filled = tuple(sorted((filled_values or {}).items()))
+    return _build_system_prompt_cached(_freeze_fields(form_fields), filled, today)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_system_prompt_cached(fields, filled, today):
+    filled_values = dict(filled)
     
     # Build field list (filter by show_when visibility and copy_from)
     fields_list = []
-    for field in form_fields:
-        field_name = field.get("field")
-        if field.get("value") or filled_values.get(field_name):
+    for field_name, desc, field_type, options, has_value, copy_from, show_when in fields:
+        if has_value or filled_values.get(field_name):
             continue
         # Skip copy_from fields — they auto-inherit from the source field
-        if field.get("copy_from"):
+        if copy_from:
             continue
-        # Skip fields whose show_when condition is not met
-        if not is_field_visible(field, filled_values):
+        # Skip fields whose show_when condition is not met (as in is_field_visible)
+        if show_when and filled_values.get(show_when[0], "") != show_when[1]:
             continue
-        desc = field.get("description", "")
         # For radio fields, list the valid options
-        if field.get("type") == "radio":
-            options = list(field.get("options", {}).keys())
+        if field_type == "radio":
             desc += f" (Options: {', '.join(options)})"
         fields_list.append(f"- {field_name}: {desc}")
     
     fields_str = "\n".join(fields_list) if fields_list else "All fields are filled!"
+    today_str = f"\nTODAY'S DATE (DDMMYYYY): {today}\n" if today else ""
     
     return f"""You are Bank Form Assistant, a friendly assistant helping users fill a bank form.
-
+{today_str}
 FIELDS STILL NEEDED:
 {fields_str}
 
@@ -64,16 +352,7 @@ RULES:
 
 5. UNDERSTAND INTENT: Map natural language to the right fields. "through cheque" means the payment mode is Cheque. "cash deposit" means Cash. Infer, don't ask.
 
-6. USE CONTEXT: The [Context] block shows what's filled and what's still needed. ONLY ask for fields in the "Still needed" list. Never re-ask for filled fields. Check which language is being used in conversation and ensure to continue the conversation in the same language the user is using.
-
-
-
-RESPOND WITH JSON ONLY:
-{{
-    "message": "Your conversational response",
-    "extracted_fields": {{"field_name": "value", ...}},
-    "ready_to_generate": true/false
-}}
+6. USE CONTEXT: The FIELDS STILL NEEDED list shows what's still needed, minus anything already under Filled in the [Context] block, when present. Never re-ask for filled fields. Check which language is being used in conversation and ensure to continue the conversation in the same language the user is using.
 
 IMPORTANT : When all fields are filled, show a summary and ask user to confirm.
 
@@ -81,6 +360,37 @@ Set ready_to_generate=true ONLY after user explicitly confirms
 
 Be warm, helpful, and EFFICIENT — minimize the number of questions."""
 
+class SemanticCache:
+    """Replies to earlier user messages, looked up by embedding similarity."""
+    
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD):
+        self.threshold = threshold
+        self.embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)  # unit rows
+        self.entries = []  # (field_state, reply) per row
+    
+    async def embed(self, text):
+        """Embed text as a unit vector, so a dot product is the cosine similarity."""
+        client = await get_client()
+        response = await client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def lookup(self, vector, field_state):
+        """Return the most similar cached reply if it clears the threshold and state matches."""
+        if not self.entries:
+            return None
+        sims = self.embeddings @ vector
+        best = int(np.argmax(sims))
+        entry_state, reply = self.entries[best]
+        if sims[best] > self.threshold and entry_state == field_state:
+            return reply
+        return None
+    
+    def add(self, vector, field_state, reply):
+        self.embeddings = np.vstack([self.embeddings, vector])
+        self.entries.append((dict(field_state), reply))
+
+
 class FormAssistant:
     # Each instance of FormAssistant has its own conversation history and field values
     def __init__(self, form_fields):
@@ -99,72 +409,287 @@ class FormAssistant:
             value = field.get("value", "")
             if value:
                 self.field_values[field.get("field")] = value
+        
+        # Askable fields in form order, and the ones among them still empty —
+        # kept up to date as values arrive instead of rescanning every turn
+        self._field_order = [f for f in form_fields if f.get("field") not in self.copy_from_fields]
+        self._unfilled = {f.get("field") for f in self._field_order} - self.field_values.keys()
+        
+        # "<field> to <value>" per askable field, longest name first so
+        # "Amount in Words" wins over "Amount"
+        self._change_patterns = [
+            (f, re.compile(re.escape(f.get("field")) + r"\s+to\s+(.+)", re.IGNORECASE))
+            for f in sorted(self._field_order, key=lambda f: len(f.get("field")), reverse=True)
+        ]
+        
+        self._filled_json = self._serialize_filled()
+        
+        # Fields the current system prompt tells the model about
+        self._prompt_fields = set(self.get_unfilled_fields())
+        self._semantic_cache = SemanticCache()
+        
+        # Running summary of the turns dropped from conversation_history
+        self._summary = ""
+        self._turns_since_summary = 0
+        self._compaction = None  # in-flight compact_history() task, if any
     
     def get_unfilled_fields(self):
         """Get list of fields still needing values (respects show_when and copy_from)."""
-        unfilled = []
-        for f in self.form_fields:
-            field_name = f.get("field")
-            if self.field_values.get(field_name):
-                continue
-            if field_name in self.copy_from_fields:
-                continue
-            if not is_field_visible(f, self.field_values):
-                continue
-            unfilled.append(field_name)
-        return unfilled
+        return [
+            f.get("field") for f in self._field_order
+            if f.get("field") in self._unfilled and is_field_visible(f, self.field_values)
+        ]
     
-    def chat(self, user_input):
-        """Send message and get response."""
+    async def chat(self, user_input, on_text=None):
+        """Send message and get response (streaming the reply's message to `on_text`, if given)."""
+        
+        # Confirmations, "change X to Y" and bare well-formed values need no model call
+        local = self._try_local_resolve(user_input)
+        if local is not None:
+            return local
         
-        # Inject current state as context (appended to user message)
-        unfilled = self.get_unfilled_fields()
+        # Current state goes in a trailing system message that is rebuilt every
+        # turn and never stored, so the system prompt + history stay a
+        # byte-identical prefix for OpenAI's automatic prompt caching
         today = datetime.now().strftime("%d%m%Y")
+        context = CONTEXT_TEMPLATE.format(today=today, filled=self._filled_json)
         
-        # Filter Filled dict — copy_from fields are invisible to the model
-        visible_filled = {k: v for k, v in self.field_values.items() if k not in self.copy_from_fields}
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            *([{"role": "system", "content": "Earlier: " + self._summary}] if self._summary else []),
+            *self.conversation_history,
+            {"role": "user", "content": user_input},
+            {"role": "system", "content": context}
+        ]
         
-        context = f"\n\n[Context: Today={today}. Filled={visible_filled}. Still needed={unfilled}]"
+        # Call OpenAI API with system prompt + conversation history + context
+        assistant_msg, query, from_model = await self._complete_or_reuse(user_input, messages, on_text)
+        if assistant_msg is None:
+            # Nothing usable came back: leave history and values as they were
+            return {
+                "message": FALLBACK_MESSAGE,
+                "extracted_fields": {},
+                "ready_to_generate": False,
+                "missing_fields": self.get_unfilled_fields()
+            }
+        if from_model and query is not None:
+            # Only replies that changed nothing are safe to reuse for a paraphrase —
+            # "my name is Abhi" and "my name is Abhay" embed almost identically
+            reply = json.loads(assistant_msg)
+            if not reply["extracted_fields"] and not reply["ready_to_generate"]:
+                self._semantic_cache.add(query, self.field_values, assistant_msg)
         
-        self.conversation_history.append({
-            "role": "user", 
-            "content": user_input + context
-        })
+        # Parse response and update field values (strict schema: always valid JSON)
+        result = unpack_extracted_fields(json.loads(assistant_msg))
+        result["missing_fields"] = self.apply_extracted_fields(result["extracted_fields"])
+        
+        self._append_exchange(user_input, assistant_msg)
+        self._turns_since_summary += 1
+        # The summary call is not needed for this reply, so it runs while the
+        # user reads it and types the next message
+        if self._turns_since_summary >= SUMMARY_EVERY_TURNS and (self._compaction is None or self._compaction.done()):
+            self._compaction = asyncio.ensure_future(self.compact_history())
+        return result
+    
+    async def _complete_or_reuse(self, user_input, messages, on_text):
+        """Ask the model, unless a paraphrase of user_input was answered in this field state.
         
-        # Call OpenAI API with system prompt + full conversation history
-        response = client.chat.completions.create(
+        Returns (reply, query embedding or None, whether the reply is new). The
+        embedding lookup runs alongside the completion rather than in front of
+        it: streamed text is held back until the lookup misses, and a hit
+        cancels the completion.
+        """
+        request = dict(
             model=MODEL,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                *self.conversation_history
-            ],
-            response_format={"type": "json_object"},
+            messages=messages,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "form_filling", "schema": FILLING_SCHEMA, "strict": True}
+            },
             temperature=0.4
         )
+        if any(c.isdigit() for c in user_input) or len(user_input.split()) > SEMANTIC_CACHE_MAX_WORDS:
+            return await complete(on_text, **request), None, True
         
-        assistant_msg = response.choices[0].message.content
-        self.conversation_history.append({
-            "role": "assistant", 
-            "content": assistant_msg
-        })
+        held = []
+        released = False
+        
+        def relay(text):
+            if released:
+                on_text(text)
+            else:
+                held.append(text)
+        
+        completion = asyncio.ensure_future(complete(relay if on_text else None, **request))
+        try:
+            query = await self._semantic_cache.embed(user_input)
+        except Exception:
+            query = None  # the cache is only a shortcut; the model's reply still comes
+        
+        cached = self._semantic_cache.lookup(query, self.field_values) if query is not None else None
+        if cached is not None:
+            completion.cancel()
+            completion.add_done_callback(lambda t: t.cancelled() or t.exception())
+            return cached, query, False
+        
+        for text in held:
+            on_text(text)
+        released = True
+        return await completion, query, True
+    
+    async def compact_history(self):
+        """Fold older turns into the running summary once history outgrows its token budget.
+        
+        Best-effort: if the summary call fails, the full history is kept and
+        the next turn tries again.
+        """
+        if self._turns_since_summary < SUMMARY_EVERY_TURNS:
+            return
+        keep = 2 * HISTORY_KEEP_TURNS
+        if len(self.conversation_history) <= keep:
+            return
+        if sum(count_tokens(m["content"]) for m in self.conversation_history) <= HISTORY_TOKEN_BUDGET:
+            return
+        
+        # Turns may be appended while the summary is requested, so only the
+        # ones summarized are dropped afterwards
+        folded = len(self.conversation_history) - keep
+        old_turns = self.conversation_history[:folded]
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in old_turns)
+        if self._summary:
+            transcript = f"Earlier summary: {self._summary}\n{transcript}"
         
-        # Parse response and update field values (ignore copy_from fields)
         try:
-            result = json.loads(assistant_msg)
-            for field, value in result.get("extracted_fields", {}).items():
-                if value and field not in self.copy_from_fields:
-                    self.field_values[field] = value
-            # Rebuild prompt so show_when conditions are re-evaluated
+            client = await get_client()
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": "Summarize these form-filling turns into 2 sentences of collected info. Mention the language the user writes in."},
+                    {"role": "user", "content": transcript}
+                ],
+                temperature=0
+            )
+        except Exception:
+            return  # keep the full history and try again next turn
+        summary = response.choices[0].message.content
+        if not summary:
+            return  # refused: keep the full history and try again later
+        self._summary = summary.strip()
+        del self.conversation_history[:folded]
+        self._turns_since_summary = 0
+    
+    def _serialize_filled(self):
+        """Filled values for the context block, re-serialized only when they change.
+        
+        copy_from fields are invisible to the model. Compact JSON (non-ASCII
+        kept as-is) tokenizes smaller than the dict repr.
+        """
+        visible_filled = {k: v for k, v in self.field_values.items() if k not in self.copy_from_fields}
+        return json.dumps(visible_filled, separators=(',', ':'), ensure_ascii=False)
+    
+    def apply_extracted_fields(self, extracted_fields):
+        """Record extracted values (ignoring copy_from fields) and return the fields still missing."""
+        changed = False
+        for field, value in extracted_fields.items():
+            if value and field not in self.copy_from_fields:
+                self.field_values[field] = value
+                self._unfilled.discard(field)
+                changed = True
+        if changed:
+            self._filled_json = self._serialize_filled()
+        missing = self.get_unfilled_fields()
+        # The model reads "still needed" as the prompt's list minus Filled, so only
+        # rebuild the prompt (and break the cached prefix) when a show_when
+        # condition reveals or hides a field and that no longer holds
+        if self._prompt_fields - self.field_values.keys() != set(missing):
             self.system_prompt = build_system_prompt(self.form_fields, self.field_values)
-            result["missing_fields"] = self.get_unfilled_fields()
-            return result
-        except json.JSONDecodeError:
-            return {
-                "message": assistant_msg, 
-                "extracted_fields": {}, 
-                "missing_fields": self.get_unfilled_fields(),
-                "ready_to_generate": False
-            }
+            self._prompt_fields = set(missing)
+        return missing
+    
+    def seed_from_detection(self, user_input, detection):
+        """Start from a combined detection reply instead of spending a turn asking for fields."""
+        extracted = detection.get("extracted_fields", {})
+        self._record_turn(user_input, detection["message"], extracted)
+        return self.apply_extracted_fields(extracted)
+    
+    def _record_turn(self, user_input, message, extracted_fields, ready_to_generate=False):
+        """Add a turn answered without this assistant's model call to the history.
+        
+        Stored in the filling format, as if the model had produced it.
+        """
+        self._append_exchange(user_input, json.dumps({
+            "message": message,
+            "extracted_fields": [{"field": k, "value": v} for k, v in extracted_fields.items()],
+            "ready_to_generate": ready_to_generate
+        }))
+    
+    def _append_exchange(self, user_input, assistant_msg):
+        """Append a user/assistant pair to the history."""
+        self.conversation_history.append({"role": "user", "content": user_input})
+        self.conversation_history.append({"role": "assistant", "content": assistant_msg})
+    
+    def _try_local_resolve(self, user_input):
+        """Answer trivial turns without the model; None means ask the model."""
+        missing = self.get_unfilled_fields()
+        
+        # 1. Confirmation once everything is filled (the summary was just shown)
+        if not missing and user_input.lower().strip(" .!") in CONFIRM_WORDS:
+            return self._local_reply(user_input, "Great! Generating your form now.", {}, ready_to_generate=True)
+        
+        # 2. "change <field> to <value>", for values that can be checked locally
+        match = CHANGE_RE.fullmatch(user_input.strip())
+        if match:
+            for spec, pattern in self._change_patterns:
+                named = pattern.fullmatch(match.group(1))
+                if not named:
+                    continue
+                field = spec.get("field")
+                # Fields named after this one (Amount -> Amount in Words) are
+                # derived from it by the model, so leave those edits to the model
+                derived = any(f.get("field").startswith(field + " ") for f in self._field_order)
+                value = None if derived else self._checked_value(spec, named.group(1).strip())
+                if value is not None:
+                    return self._local_reply(user_input, f"Done, {field} is now {value}.", {field: value})
+                break
+        
+        # 3. A bare value in the format of the one field still needed
+        if len(missing) == 1 and missing[0] in _FIELD_VALIDATORS:
+            value = user_input.strip()
+            if validate_field(missing[0], value):
+                return self._local_reply(user_input, f"Got it, {missing[0]}: {value}.", {missing[0]: value})
+        
+        return None
+    
+    @staticmethod
+    def _checked_value(spec, value):
+        """value as it should be stored for this field, or None if only the model can judge it.
+        
+        Radio values must name one of the options (matched case-insensitively);
+        other fields need a validator that accepts the value.
+        """
+        if spec.get("type") == "radio":
+            options = {option.lower(): option for option in spec.get("options", {})}
+            return options.get(value.lower())
+        name = spec.get("field")
+        if name in _FIELD_VALIDATORS and validate_field(name, value):
+            return value
+        return None
+    
+    def _local_reply(self, user_input, message, extracted_fields, ready_to_generate=False):
+        """Apply a locally resolved turn and shape it like a model reply."""
+        missing = self.apply_extracted_fields(extracted_fields)
+        if not missing and not ready_to_generate:
+            summary = "\n".join(f"   • {k}: {v}" for k, v in self.field_values.items() if k not in self.copy_from_fields)
+            message += f" Here's everything I have:\n{summary}\nShall I generate the form?"
+        elif missing and not ready_to_generate:
+            message += f" Still needed: {', '.join(missing)}."
+        self._record_turn(user_input, message, extracted_fields, ready_to_generate)
+        return {
+            "message": message,
+            "extracted_fields": extracted_fields,
+            "ready_to_generate": ready_to_generate,
+            "missing_fields": missing
+        }
     
     def get_filled_form(self):
         """Return form fields with filled values for PDF generation."""
@@ -176,10 +701,26 @@ class FormAssistant:
         return filled
 
 
-def load_available_forms(json_path="available_forms.json"):
-    """Load catalog of available forms."""
+@functools.lru_cache(maxsize=8)
+def _load_catalog(json_path, mtime_ns):
+    """Parse the catalog and pre-build its derived views (once per file version)."""
     with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+        available_forms = json.load(f)
+    all_forms = get_all_forms_flat(available_forms)
+    return available_forms, all_forms, json.dumps(get_form_info(all_forms), separators=(',', ':'), ensure_ascii=False)
+
+
+def load_catalog(json_path="available_forms.json"):
+    """Return (available_forms, all_forms flat list, prompt JSON block); don't mutate them.
+    
+    Re-read only when the file's mtime changes.
+    """
+    return _load_catalog(json_path, os.stat(json_path).st_mtime_ns)
+
+
+def load_available_forms(json_path="available_forms.json"):
+    """Load catalog of available forms (cached until the file changes; don't mutate the result)."""
+    return load_catalog(json_path)[0]
 
 
 def load_form_coordinates(json_path):
@@ -209,10 +750,8 @@ def get_all_forms_flat(available_forms):
     return all_forms
 
 
-def build_form_finder_prompt(available_forms):
-    """Build system prompt for form detection conversation."""
-    all_forms = get_all_forms_flat(available_forms)
-    
+def get_form_info(all_forms):
+    """The per-form details the detection prompt shows the model."""
     form_info = []
     for f in all_forms:
         form_info.append({
@@ -221,11 +760,26 @@ def build_form_finder_prompt(available_forms):
             "description": f["description"],
             "aliases": f["aliases"]
         })
+    return form_info
+
+
+def build_form_finder_prompt(available_forms, forms_json=None):
+    """Build system prompt for form detection conversation.
     
+    Pass the pre-built `forms_json` block from load_catalog() to skip
+    re-flattening and re-serializing the catalog.
+    """
+    if forms_json is None:
+        forms_json = json.dumps(get_form_info(get_all_forms_flat(available_forms)), separators=(',', ':'), ensure_ascii=False)
+    return _build_form_finder_prompt_cached(forms_json)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_form_finder_prompt_cached(forms_json):
     return f"""You are Bank Form Assistant, a friendly banking assistant helping users find and fill bank forms.
 
 AVAILABLE FORMS:
-{json.dumps(form_info, indent=2)}
+{forms_json}
 
 YOUR JOB:
 - Greet the user warmly and ask what they need help with
@@ -236,81 +790,98 @@ YOUR JOB:
 - If user wants to end the conversation, say goodbye
 - Respond in the same language the user is using
 
-RESPOND WITH JSON ONLY:
-{{
-    "message": "Your conversational response to the user",
-    "form_name": "exact form_name from list if identified, otherwise null",
-    "bank": "bank name if form identified, otherwise null",
-    "confidence": "high/medium/low",
-    "end_conversation": true/false
-}}
-
 Set end_conversation=true ONLY if user explicitly wants to quit/exit/end.
 Set form_name only when you're confident about which form they need.
 
 Be warm, helpful, and conversational. Don't be robotic."""
 
 
+def build_field_catalog(all_forms):
+    """Map each form_name to the {field: description} the user will be asked for."""
+    catalog = {}
+    for f in all_forms:
+        coordinates_file = f.get("coordinates_file") or "field_coordinates.json"
+        try:
+            form_fields = load_form_fields(coordinates_file, f["form_name"])
+        except OSError as e:
+            # One broken entry shouldn't stop the CLI from starting
+            print(f"⚠️ Skipping fields of {f['form_name']}: {e}")
+            continue
+        fields = {}
+        for field in form_fields:
+            # Same filtering as build_system_prompt with nothing filled yet
+            if field.get("value") or field.get("copy_from") or not is_field_visible(field, {}):
+                continue
+            fields[field.get("field")] = field.get("description", "")
+        catalog[f["form_name"]] = fields
+    return catalog
+
+
+def build_combined_prompt(available_forms, field_catalog, forms_json=None):
+    """Form finder prompt that also starts filling once the form is identified."""
+    return f"""{build_form_finder_prompt(available_forms, forms_json)}
+
+FORM FIELDS (by form_name):
+{json.dumps(field_catalog, separators=(',', ':'), ensure_ascii=False)}
+
+ONCE YOU IDENTIFY THE FORM:
+- In that same reply, ask for all of the form's fields together in one question
+- Put every field value the user has already given into extracted_fields, using the exact field names above
+- Until then, leave extracted_fields empty"""
+
+
 class FormFinder:
     """Conversational assistant to help user find the right form."""
     
-    def __init__(self, available_forms):
-        self.available_forms = available_forms
-        self.system_prompt = build_form_finder_prompt(available_forms)
+    def __init__(self, json_path="available_forms.json"):
+        self.available_forms, self.all_forms, forms_json = load_catalog(json_path)
+        self.system_prompt = build_combined_prompt(self.available_forms, build_field_catalog(self.all_forms), forms_json)
         self.conversation_history = []
     
-    def chat(self, user_input):
-        """Send message and get response."""
+    async def chat(self, user_input, on_text=None):
+        """Send message and get response (streaming the reply's message to `on_text`, if given)."""
         self.conversation_history.append({
             "role": "user",
             "content": user_input
         })
         
-        response = client.chat.completions.create(
+        assistant_msg = await complete(
+            on_text,
             model=MODEL,
             messages=[
                 {"role": "system", "content": self.system_prompt},
                 *self.conversation_history
             ],
-            response_format={"type": "json_object"},
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "form_detection", "schema": COMBINED_SCHEMA, "strict": True}
+            },
             temperature=0.4
         )
         
-        assistant_msg = response.choices[0].message.content
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": assistant_msg
-        })
-        
-        try:
-            return json.loads(assistant_msg)
-        except json.JSONDecodeError:
+        if assistant_msg is None:
+            # Nothing usable came back: drop the unanswered turn and ask again
+            self.conversation_history.pop()
             return {
-                "message": assistant_msg,
+                "message": FALLBACK_MESSAGE,
                 "form_name": None,
                 "bank": None,
                 "confidence": "low",
-                "end_conversation": False
+                "end_conversation": False,
+                "extracted_fields": {}
             }
+        
+        self.conversation_history.append({
+            "role": "assistant",
+            "content": assistant_msg
+        })
+        
+        return unpack_extracted_fields(json.loads(assistant_msg))
     
     def get_greeting(self):
-        """Get initial greeting from assistant."""
-        # Prime the conversation with a greeting request
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": "[System: Generate your opening greeting to the user]"}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7
-        )
-        
-        try:
-            result = json.loads(response.choices[0].message.content)
-            return result.get("message", "Hello! How can I help you today?")
-        except:
-            return "Hello! I'm your Bank Form Assistant. How can I help you with your banking forms today?"
+        """Get initial greeting from assistant (fixed text; no model call needed)."""
+        names = ", ".join(f["form_name"] for f in self.all_forms[:3])
+        return f"Hi! I'm your Bank Form Assistant. I can help you fill forms like {names}. Which form do you need today?"
 
 
 def get_form_details(available_forms, form_name, bank_name=None):
@@ -337,24 +908,76 @@ def load_form_fields(coordinates_file, form_name):
 
 
 # --- Main ---
-if __name__ == "__main__":
+class ReplyPrinter:
+    """Print an assistant reply as it streams in, or whole if it didn't stream."""
+    
+    def __init__(self):
+        self.started = False
+        self.shown = []
+    
+    def write(self, text):
+        if not self.started:
+            print("\n🤖 Assistant: ", end="")
+            self.started = True
+        self.shown.append(text)
+        print(text, end="", flush=True)
+    
+    def finish(self, message):
+        if not self.started:
+            print(f"\n🤖 Assistant: {message}\n")
+        elif "".join(self.shown) != message:
+            # The streamed attempt was cut off and its retry (or fallback) differs
+            print(f"\n🤖 Assistant: {message}\n")
+        else:
+            print("\n")
+
+
+async def prompt_user(prompt="👤 You: "):
+    """Read a line in a worker thread so in-flight API calls keep running meanwhile.
+    
+    A daemon thread rather than the loop's executor: asyncio.run waits for
+    executor threads on the way out, so Ctrl+C would hang in input().
+    """
+    loop = asyncio.get_running_loop()
+    line = loop.create_future()
+    
+    def deliver(setter, value):
+        if not line.done():  # cancelled by Ctrl+C meanwhile
+            setter(value)
+    
+    def read():
+        try:
+            text = input(prompt)
+        except BaseException as e:  # EOFError on closed stdin
+            loop.call_soon_threadsafe(deliver, line.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(deliver, line.set_result, text)
+    
+    threading.Thread(target=read, name="stdin-reader", daemon=True).start()
+    return (await line).strip()
+
+
+async def main():
+    # Build the OpenAI client in the background while the catalog prints and
+    # the user types their first message
+    client_task = asyncio.create_task(get_client())
+    await asyncio.sleep(0)  # let it start before printing
+    
+    # Initialize form finder assistant
+    available_forms, all_forms, _ = load_catalog("available_forms.json")
+    form_finder = FormFinder("available_forms.json")
+    
     print("=" * 50)
     print("🏦 Bank Form Assistant")
     print("=" * 50)
     
-    # Load catalog of available forms
-    available_forms = load_available_forms("available_forms.json")
-    all_forms = get_all_forms_flat(available_forms)
-    
+    # Show catalog of available forms
     print(f"\n📋 Available forms:")
     for f in all_forms:
         print(f"   • {f['form_name']} ({f['bank']})")
     print()
     
-    # Initialize form finder assistant
-    form_finder = FormFinder(available_forms)
-    
-    # Get and show greeting
+    # Show greeting
     greeting = form_finder.get_greeting()
     print(f"🤖 Assistant: {greeting}\n")
     
@@ -363,7 +986,7 @@ if __name__ == "__main__":
     bank_name = None
     
     while True:
-        user_input = input("👤 You: ").strip()
+        user_input = await prompt_user()
         
         if not user_input:
             continue
@@ -372,8 +995,9 @@ if __name__ == "__main__":
             print("\n🤖 Assistant: Goodbye! Have a great day! 👋")
             exit()
         
-        response = form_finder.chat(user_input)
-        print(f"\n🤖 Assistant: {response.get('message', '')}\n")
+        printer = ReplyPrinter()
+        response = await form_finder.chat(user_input, on_text=printer.write)
+        printer.finish(response["message"])
         
         # Check if user wants to end
         if response.get("end_conversation"):
@@ -404,6 +1028,11 @@ if __name__ == "__main__":
         print(f"❌ Could not load form fields from: {coordinates_file}")
         exit()
     
+    # Initialize form filling assistant — the detection reply above already
+    # asked for the fields and carries any values the user gave so far
+    assistant = FormAssistant(form_fields)
+    assistant.seed_from_detection(user_input, response)
+    
     pdf_path = form_details.get("pdf_path", f"forms/{form_name}.pdf")
     
     print(f"📄 Form: {form_name} ({bank_name})")
@@ -411,16 +1040,9 @@ if __name__ == "__main__":
     print("-" * 50)
     print("Type 'quit' to exit anytime\n")
     
-    # Initialize form filling assistant
-    assistant = FormAssistant(form_fields)
-    
-    # Get initial prompt from form assistant
-    initial_response = assistant.chat(f"I want to fill the {form_name} form. What information do you need?")
-    print(f"🤖 Assistant: {initial_response['message']}\n")
-    
     # Phase 3: Form Filling Conversation
     while True:
-        user_input = input("👤 You: ").strip()
+        user_input = await prompt_user()
         
         if user_input.lower() in ['quit', 'exit', 'q']:
             print("\n👋 Goodbye!")
@@ -428,8 +1050,9 @@ if __name__ == "__main__":
         if not user_input:
             continue
         
-        response = assistant.chat(user_input)
-        print(f"\n🤖 Assistant: {response['message']}\n")
+        printer = ReplyPrinter()
+        response = await assistant.chat(user_input, on_text=printer.write)
+        printer.finish(response["message"])
         
         if response.get('ready_to_generate'):
             print("=" * 50)
@@ -438,6 +1061,7 @@ if __name__ == "__main__":
                 print(f"   • {k}: {v}")
             
             # Generate the PDF
+            # Imported here so CLI start-up doesn't pay for PyMuPDF/reportlab/PyPDF2
             from fill_form import fill_pdf_from_chatbot
             output_path = fill_pdf_from_chatbot(
                 chatbot_values=assistant.field_values,
@@ -448,3 +1072,13 @@ if __name__ == "__main__":
             if output_path:
                 print(f"\n🎉 Form filled successfully! Check: {output_path}")
             break
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!", flush=True)
+        # The stdin reader may still be blocked in input(); interpreter shutdown
+        # would abort on its stdin lock, so leave without waiting for it
+        os._exit(130)
@@ -1,17 +1,96 @@
+import os
+import copy
 import json
+import logging
+import functools
+import threading
+from itertools import groupby
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
 from PyPDF2 import PdfReader, PdfWriter
 import io
 
+try:
+    from orjson import loads as _json_loads  # Faster parse for the coordinates file
+except ImportError:
+    _json_loads = json.loads
+
+
+logger = logging.getLogger(__name__)
+
+
+# Parsed coordinate files: path -> (mtime_ns, data), plus a form_name -> form
+# index per path built alongside. Callers must not mutate either.
+_JSON_CACHE = {}
+_FORM_INDEX = {}
+
 
 def load_field_coordinates(json_path):
-    """Load field coordinates and values from JSON file."""
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        print(f"Loaded fields: {data}")
-        return data
+    """Load field coordinates and values from JSON file (re-parsed only when it changes)."""
+    mtime = os.stat(json_path).st_mtime_ns
+    hit = _JSON_CACHE.get(json_path)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with open(json_path, 'rb') as f:
+        data = _json_loads(f.read())
+    logger.debug("Loaded fields from %s: %s", json_path, data)
+    _JSON_CACHE[json_path] = (mtime, data)
+    index = _FORM_INDEX[json_path] = {}
+    for form in data:
+        index.setdefault(form.get("form_name"), form)  # first match wins, as the old scan did
+    return data
+
+
+def get_form(json_path, form_name):
+    """Look up one form's entry in a coordinates file by name (None if absent)."""
+    load_field_coordinates(json_path)
+    return _FORM_INDEX[json_path].get(form_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_template(path, mtime_ns):
+    # Resolve the page objects once; the pages keep their reader alive
+    pages = tuple(PdfReader(path).pages)
+    box = pages[0].mediabox
+    return pages, float(box.width), float(box.height)
+
+
+# The cached readers parse objects lazily from a shared file handle
+_TEMPLATE_LOCK = threading.Lock()
+
+
+def load_template(path):
+    """Parsed template pages plus first-page size, re-read only when the file changes.
+    
+    The pages are shared between fills, so they must not be modified;
+    use merge_onto_template to build each filled copy.
+    """
+    return _load_template(path, os.stat(path).st_mtime_ns)
+
+
+def merge_onto_template(pages, overlay_page, writer):
+    """Add the template's pages to writer, with the overlay merged onto the first."""
+    # Shallow copy is enough: merge_page only replaces top-level keys
+    first = copy.copy(pages[0])
+    with _TEMPLATE_LOCK:
+        first.merge_page(overlay_page)
+        # The merged contents come back decoded; re-deflate them or
+        # every fill writes the template's page stream out uncompressed
+        first.compress_content_streams()
+        writer.add_page(first)
+        for page in pages[1:]:
+            writer.add_page(page)
+
+
+def write_pdf(writer, path):
+    """Serialize writer in memory, then write the file in one go."""
+    # PdfWriter.write issues a small write per object; buffering turns those into one
+    buf = io.BytesIO()
+    writer.write(buf)
+    with open(path, 'wb') as output_file:
+        output_file.write(buf.getbuffer())
 
 
 # Default styling
@@ -21,23 +100,41 @@ DEFAULT_COLOR = (0, 0, 0.5)  # Navy blue (RGB)
 DEFAULT_FONT_FAMILY = "Helvetica"
 
 
+# Font family -> (regular, bold) reportlab font names
+FONT_FAMILIES = {
+    'Helvetica':   ('Helvetica',       'Helvetica-Bold'),
+    'Courier':     ('Courier',         'Courier-Bold'),
+    'Times-Roman': ('Times-Roman',     'Times-Bold'),
+}
+
+
+@functools.lru_cache(maxsize=128)
 def hex_to_rgb(hex_color):
     """Convert '#RRGGBB' to (r, g, b) floats 0-1."""
     hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) / 255.0 for i in (0, 2, 4))
+    return (int(hex_color[0:2], 16) / 255.0, int(hex_color[2:4], 16) / 255.0, int(hex_color[4:6], 16) / 255.0)
 
 
+@functools.lru_cache(maxsize=32)
 def resolve_font_name(family, bold):
     """Map a font family + bold flag to a reportlab font name."""
-    fonts = {
-        'Helvetica':   ('Helvetica',       'Helvetica-Bold'),
-        'Courier':     ('Courier',         'Courier-Bold'),
-        'Times-Roman': ('Times-Roman',     'Times-Bold'),
-    }
-    pair = fonts.get(family, fonts['Helvetica'])
+    pair = FONT_FAMILIES.get(family, FONT_FAMILIES['Helvetica'])
     return pair[1] if bold else pair[0]
 
 
+# Load the width tables of every font the overlay can pick up front, so the
+# first fill doesn't pay for it mid-draw
+for _pair in FONT_FAMILIES.values():
+    for _name in _pair:
+        pdfmetrics.getFont(_name)
+
+
+@functools.lru_cache(maxsize=4096)
+def wrap_text(text, font_name, font_size, box_width):
+    """Word-wrap text to box_width (memoized simpleSplit; values repeat across fills)."""
+    return tuple(simpleSplit(text, font_name, font_size, box_width))
+
+
 def create_text_overlay(fields, page_width, page_height, pdf_settings=None):
     """Create a PDF with text at the specified coordinates."""
     pdf_settings = pdf_settings or {}
@@ -47,10 +144,18 @@ def create_text_overlay(fields, page_width, page_height, pdf_settings=None):
     global_size   = pdf_settings.get('font_size', DEFAULT_FONT_SIZE)
     global_bold   = pdf_settings.get('bold', DEFAULT_BOLD)
     global_color  = hex_to_rgb(pdf_settings['color']) if 'color' in pdf_settings else DEFAULT_COLOR
+    font_bold     = resolve_font_name(global_family, True)
+    font_normal   = resolve_font_name(global_family, False)
+    
+    # Checked once: per-field messages are only worth building when someone reads them
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     packet = io.BytesIO()
     can = canvas.Canvas(packet, pagesize=(page_width, page_height))
     
+    # Colour is the same for every field; set it once for the whole overlay
+    can.setFillColorRGB(*global_color)
+    
     # Build a lookup of all field values for show_when evaluation
     all_values = {f.get("field"): f.get("value", "") for f in fields}
     
@@ -59,16 +164,45 @@ def create_text_overlay(fields, page_width, page_height, pdf_settings=None):
         copy_src = field.get("copy_from")
         if copy_src and not field.get("value"):
             field["value"] = all_values.get(copy_src, "")
-            if field["value"]:
-                print(f"copy_from: '{field.get('field')}' ← '{copy_src}' = '{field['value']}'")
+            if debug and field["value"]:
+                logger.debug("copy_from: '%s' ← '%s' = '%s'", field.get("field"), copy_src, field["value"])
+    
+    def font_for(field):
+        field_type = field.get("type", "text")
+        if field_type == "radio":
+            name = font_bold
+        elif field_type == "checkbox":
+            name = "Helvetica-Bold"
+        else:
+            name = font_bold if field.get("bold", global_bold) else font_normal
+        return name, field.get("font_size", global_size)
+    
+    # Every field is drawn into this one text object (a single BT/ET block),
+    # positioned with setTextOrigin. Only emit a Tf when the font actually
+    # changes; drawing fields grouped by font keeps those switches to a minimum
+    # (placement doesn't depend on order)
+    text = can.beginText()
+    current_font = None
+    
+    def use_font(key):
+        nonlocal current_font
+        if key != current_font:
+            text.setFont(*key)
+            current_font = key
+    
+    # Nothing to draw without a value, or without coordinates (radios carry theirs per option)
+    active = [f for f in fields if f.get("value") and (f.get("start") or f.get("type") == "radio")]
+    if debug and len(active) < len(fields):
+        logger.debug("Skipping %d fields with missing coordinates or value.", len(fields) - len(active))
+    
+    fields = sorted(active, key=lambda f: (*font_for(f), f.get("type", "text")))
     
     for field in fields:
         field_name = field.get("field")
         start = field.get("start")
         value = field.get("value", "")
         spacing = field.get("spacing")  # Optional: spacing between characters
-        font_size = field.get("font_size", global_size)
-        is_bold = field.get("bold", global_bold)
+        font_name, font_size = font_for(field)
         field_type = field.get("type", "text")
         
         # Skip fields whose show_when condition is not met
@@ -76,72 +210,79 @@ def create_text_overlay(fields, page_width, page_height, pdf_settings=None):
         if show_when:
             parent_val = all_values.get(show_when.get("field"), "")
             if parent_val != show_when.get("equals"):
-                print(f"Skipping '{field_name}' — show_when condition not met")
+                if debug:
+                    logger.debug("Skipping '%s' — show_when condition not met", field_name)
                 continue
         
         # Handle radio type: draw tick at the selected option's coordinates
-        if field_type == "radio" and value:
+        if field_type == "radio":
             options = field.get("options", {})
             selected = options.get(value)
             if selected and "tick" in selected:
                 tx, ty = selected["tick"]
                 pdf_ty = page_height - ty
-                tick_size = field.get("font_size", global_size)
-                can.setFont(resolve_font_name(global_family, True), tick_size)
-                can.setFillColorRGB(*global_color)
+                use_font((font_name, font_size))
                 tick_char = field.get("tick_char", "X")
-                print(f"Filling radio '{field_name}' = '{value}' with '{tick_char}' at ({tx}, {pdf_ty})")
-                can.drawString(tx, pdf_ty, tick_char)
+                if debug:
+                    logger.debug("Filling radio '%s' = '%s' with '%s' at (%s, %s)", field_name, value, tick_char, tx, pdf_ty)
+                text.setTextOrigin(tx, pdf_ty)
+                text.textOut(tick_char)
             else:
-                print(f"Skipping radio '{field_name}' — option '{value}' not found in options")
+                logger.warning("Skipping radio '%s' — option '%s' not found in options", field_name, value)
             continue
         
-        if start and value:
-            x, y = start[0], start[1]
-            # PDF coordinates start from bottom-left, so we need to flip y
-            pdf_y = page_height - y
+        x, y = start[0], start[1]
+        # PDF coordinates start from bottom-left, so we need to flip y
+        pdf_y = page_height - y
+        
+        # Global family + per-field bold/size (checkboxes always Helvetica-Bold)
+        use_font((font_name, font_size))
+        
+        # Handle checkbox type differently
+        if field_type == "checkbox":
+            # Draw a clear X or checkmark for checkboxes
+            if debug:
+                logger.debug("Filling checkbox '%s' with '%s' at (%s, %s)", field_name, value, x, pdf_y)
+            text.setTextOrigin(x, pdf_y)
+            text.textOut(str(value))
+        elif field.get("multiline"):
+            # Multiline: word-wrap text within bounding box
+            end = field.get("end", start)
+            box_width = abs(end[0] - start[0])
+            box_height = abs(end[1] - start[1])
+            line_spacing = field.get("line_spacing", font_size * 1.3)
             
-            # Set font using global family + per-field bold/size
-            font_name = resolve_font_name(global_family, is_bold)
-            can.setFont(font_name, font_size)
+            # Word-wrap the text to fit the available width
+            lines = wrap_text(str(value), font_name, font_size, box_width)
             
-            # Set color from settings
-            can.setFillColorRGB(*global_color)
+            # Calculate max lines that fit in the bounding box
+            max_lines = max(1, int(box_height / line_spacing) + 1) if box_height > 0 else len(lines)
+            lines = lines[:max_lines]
             
-            # Handle checkbox type differently
-            if field_type == "checkbox":
-                # Draw a clear X or checkmark for checkboxes
-                can.setFont("Helvetica-Bold", font_size)
-                print(f"Filling checkbox '{field_name}' with '{value}' at ({x}, {pdf_y})")
-                can.drawString(x, pdf_y, str(value))
-            elif field.get("multiline"):
-                # Multiline: word-wrap text within bounding box
-                end = field.get("end", start)
-                box_width = abs(end[0] - start[0])
-                box_height = abs(end[1] - start[1])
-                line_spacing = field.get("line_spacing", font_size * 1.3)
-                
-                # Word-wrap the text to fit the available width
-                lines = simpleSplit(str(value), font_name, font_size, box_width)
-                
-                # Calculate max lines that fit in the bounding box
-                max_lines = max(1, int(box_height / line_spacing) + 1) if box_height > 0 else len(lines)
-                lines = lines[:max_lines]
-                
-                print(f"Filling multiline '{field_name}' with {len(lines)} lines at ({x}, {pdf_y}) [box={box_width}x{box_height}, spacing={line_spacing}]")
-                for i, line in enumerate(lines):
-                    can.drawString(x, pdf_y - (i * line_spacing), line)
-            elif spacing:
-                # Draw each character with spacing (for fields with individual boxes)
-                print(f"Filling '{field_name}' with '{value}' at ({x}, {pdf_y}) [size={font_size}, spacing={spacing}]")
-                for i, char in enumerate(str(value)):
-                    can.drawString(x + (i * spacing), pdf_y, char)
-            else:
-                print(f"Filling '{field_name}' with '{value}' at ({x}, {pdf_y}) [size={font_size}]")
-                can.drawString(x, pdf_y, str(value))
+            if debug:
+                logger.debug("Filling multiline '%s' with %d lines at (%s, %s) [box=%sx%s, spacing=%s]",
+                             field_name, len(lines), x, pdf_y, box_width, box_height, line_spacing)
+            text.setTextOrigin(x, pdf_y)
+            text.setLeading(line_spacing)
+            for line in lines:
+                text.textLine(line)
+        elif spacing:
+            # One character per box: the char space tops each glyph's advance up to
+            # `spacing`, so runs of equal-width glyphs (digits) go out as a single Tj
+            if debug:
+                logger.debug("Filling '%s' with '%s' at (%s, %s) [size=%s, spacing=%s]", field_name, value, x, pdf_y, font_size, spacing)
+            text.setTextOrigin(x, pdf_y)
+            for width, run in groupby(str(value), key=lambda c: can.stringWidth(c, font_name, font_size)):
+                text.setCharSpace(spacing - width)
+                text.textOut("".join(run))
+            text.setCharSpace(0)
         else:
-            print(f"Skipping field '{field_name}' due to missing coordinates or value.")
+            if debug:
+                logger.debug("Filling '%s' with '%s' at (%s, %s) [size=%s]", field_name, value, x, pdf_y, font_size)
+            text.setTextOrigin(x, pdf_y)
+            text.textOut(str(value))
     
+    can.drawText(text)
     can.save()
     packet.seek(0)
     return packet
@@ -150,48 +291,52 @@ def create_text_overlay(fields, page_width, page_height, pdf_settings=None):
 def fill_pdf_form(input_pdf_path, output_pdf_path, json_path, form_name="Pay-in-Slip"):
     """Fill the PDF form with values from the JSON file."""
     # Load field coordinates and values
-    forms = load_field_coordinates(json_path)
-
-    fields = None
-    for form in forms:
-        if form.get("form_name") == form_name:
-            fields = form.get("form_fields")
-            print(f"Found fields for form '{form_name}': {fields}")
-            break
+    form = get_form(json_path, form_name)
+    fields = form.get("form_fields") if form else None
+    if fields:
+        logger.debug("Found fields for form '%s': %s", form_name, fields)
     
     if not fields:
-        print(f"No fields found for form '{form_name}'")
+        logger.warning("No fields found for form '%s'", form_name)
         return
-    # Read the original PDF
-    reader = PdfReader(input_pdf_path)
-    writer = PdfWriter()
+    # Work on copies — the parsed JSON is cached and the overlay fills in values
+    fields = [dict(f) for f in fields]
     
-    # Get the first page dimensions
-    first_page = reader.pages[0]
-    page_width = float(first_page.mediabox.width)
-    page_height = float(first_page.mediabox.height)
+    # Read the original PDF (and the first page dimensions)
+    pages, page_width, page_height = load_template(input_pdf_path)
+    writer = PdfWriter()
     
-    print(f"PDF page size: {page_width} x {page_height}")
+    logger.debug("PDF page size: %s x %s", page_width, page_height)
     
     # Create overlay with text
     overlay_packet = create_text_overlay(fields, page_width, page_height)
     overlay_reader = PdfReader(overlay_packet)
     overlay_page = overlay_reader.pages[0]
     
-    # Merge overlay with each page of the original PDF
-    for i, page in enumerate(reader.pages):
-        if i == 0:  # Only apply overlay to first page
-            page.merge_page(overlay_page)
-        writer.add_page(page)
+    # Merge overlay with the original PDF
+    merge_onto_template(pages, overlay_page, writer)
     
     # Write the output PDF
-    with open(output_pdf_path, 'wb') as output_file:
-        writer.write(output_file)
+    write_pdf(writer, output_pdf_path)
     
-    print(f"Filled PDF saved to: {output_pdf_path}")
+    logger.info("Filled PDF saved to: %s", output_pdf_path)
     return output_pdf_path
 
 
+@functools.lru_cache(maxsize=32)
+def _chatbot_overlay(json_path, mtime_ns, form_name, values, page_width, page_height, settings):
+    """Overlay page for one form + set of values (dicts frozen to sorted item tuples)."""
+    values = dict(values)
+    # Merge chatbot values into copies of the fields (the parsed JSON is cached,
+    # so it must stay untouched for the next fill)
+    fields = [
+        dict(field, value=values[field.get("field")]) if field.get("field") in values else dict(field)
+        for field in get_form(json_path, form_name)["form_fields"]
+    ]
+    overlay_packet = create_text_overlay(fields, page_width, page_height, dict(settings))
+    return PdfReader(overlay_packet).pages[0]
+
+
 def fill_pdf_from_chatbot(chatbot_values, json_path="field_coordinates.json", form_name="Pay-in-Slip",
                          input_pdf=None, output_pdf=None, pdf_settings=None):
     """
@@ -205,18 +350,11 @@ def fill_pdf_from_chatbot(chatbot_values, json_path="field_coordinates.json", fo
         output_pdf: output PDF path (auto-generated if None)
     """
     # Load field coordinates from JSON
-    forms = load_field_coordinates(json_path)
-    
-    fields = None
-    form_data = None
-    for form in forms:
-        if form.get("form_name") == form_name:
-            form_data = form
-            fields = form.get("form_fields")
-            break
+    form_data = get_form(json_path, form_name)
+    fields = form_data.get("form_fields") if form_data else None
     
     if not fields:
-        print(f"No fields found for form '{form_name}'")
+        logger.warning("No fields found for form '%s'", form_name)
         return None
     
     # Get PDF paths from JSON or use provided ones
@@ -225,42 +363,32 @@ def fill_pdf_from_chatbot(chatbot_values, json_path="field_coordinates.json", fo
     if output_pdf is None:
         output_pdf = input_pdf.replace(".pdf", "_filled.pdf")
     
-    # Merge chatbot values with field coordinates
-    for field in fields:
-        field_name = field.get("field")
-        if field_name in chatbot_values:
-            field["value"] = chatbot_values[field_name]
-    
     # Read the original PDF
-    reader = PdfReader(input_pdf)
+    pages, page_width, page_height = load_template(input_pdf)
     writer = PdfWriter()
     
-    first_page = reader.pages[0]
-    page_width = float(first_page.mediabox.width)
-    page_height = float(first_page.mediabox.height)
-    
-    print(f"PDF page size: {page_width} x {page_height}")
+    logger.debug("PDF page size: %s x %s", page_width, page_height)
     
-    # Create overlay with text
-    overlay_packet = create_text_overlay(fields, page_width, page_height, pdf_settings)
-    overlay_reader = PdfReader(overlay_packet)
-    overlay_page = overlay_reader.pages[0]
+    # Create overlay with text; generating the same form with the same values
+    # and settings again reuses the earlier overlay instead of redrawing it
+    overlay_page = _chatbot_overlay(
+        json_path, _JSON_CACHE[json_path][0], form_name, tuple(sorted(chatbot_values.items())),
+        page_width, page_height, tuple(sorted((pdf_settings or {}).items())),
+    )
     
     # Merge overlay with original PDF
-    for i, page in enumerate(reader.pages):
-        if i == 0:
-            page.merge_page(overlay_page)
-        writer.add_page(page)
+    merge_onto_template(pages, overlay_page, writer)
     
     # Write output
-    with open(output_pdf, 'wb') as output_file:
-        writer.write(output_file)
+    write_pdf(writer, output_pdf)
     
-    print(f"\n✅ Filled PDF saved to: {output_pdf}")
+    logger.info("Filled PDF saved to: %s", output_pdf)
     return output_pdf
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # File paths
     input_pdf = "forms/Pay-in-Slip.pdf"
     output_pdf = "forms/Pay-in-Slip_filled.pdf"
@@ -8,64 +8,114 @@ warnings.filterwarnings("ignore")
 logging.getLogger("transformers").setLevel(logging.ERROR)
 logging.getLogger("transformers.generation").setLevel(logging.ERROR)
 
-import sounddevice as sd
+import functools
+import queue
 import numpy as np
 from transformers import WhisperProcessor, WhisperForConditionalGeneration
 import torch
 
+logger = logging.getLogger(__name__)
+
 # Configuration
 MODEL_NAME = "openai/whisper-small"  # Options: whisper-tiny, whisper-base, whisper-small, whisper-medium, whisper-large
 SAMPLE_RATE = 16000  # Whisper expects 16kHz audio
 RECORDING_DURATION = 7  # seconds (reduced for faster testing)
+BLOCKS_PER_SECOND = 10  # microphone is read in 100ms blocks
+SILENCE_RMS = 0.005  # a block quieter than this counts as silence
+SILENCE_STOP_SECONDS = 1.0  # stop recording after this much silence following speech
+TRIM_MARGIN_SECONDS = 0.1  # audio kept either side of the speech when trimming
+MAX_NEW_TOKENS = 128  # form answers are short; bounds decoding on a bad clip
+COMPILE_MODEL = os.environ.get("WHISPER_COMPILE") == "1"  # opt-in torch.compile on GPU
 
-print(f"Loading Whisper model: {MODEL_NAME}...")
-print("(This may take a minute on first run as it downloads the model)\n")
-
-# Load model and processor
-processor = WhisperProcessor.from_pretrained(MODEL_NAME)
-model = WhisperForConditionalGeneration.from_pretrained(MODEL_NAME)
+# Use GPU if available, in half precision there (tensor cores, half the activation memory)
+device = "cuda" if torch.cuda.is_available() else "cpu"
+dtype = torch.float16 if device == "cuda" else torch.float32
 
-# Fix deprecated config - set language explicitly
-model.config.forced_decoder_ids = None
 
-# Use GPU if available
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model = model.to(device)
-print(f"Model loaded on: {device}")
+@functools.lru_cache(maxsize=1)
+def _get_pipeline():
+    """Load processor and model on first use; every later transcription reuses them."""
+    processor = WhisperProcessor.from_pretrained(MODEL_NAME)
+    # SDPA: fused attention kernels instead of the eager matmul/softmax path.
+    # transformers rejects it when the installed torch is too old for it
+    try:
+        model = WhisperForConditionalGeneration.from_pretrained(MODEL_NAME, torch_dtype=dtype, attn_implementation="sdpa")
+    except (ValueError, ImportError) as e:
+        logger.warning("SDPA attention unavailable (%s); using eager attention", e)
+        model = WhisperForConditionalGeneration.from_pretrained(MODEL_NAME, torch_dtype=dtype, attn_implementation="eager")
+    
+    # Fix deprecated config - set language explicitly
+    model.config.forced_decoder_ids = None
+    
+    model = model.to(device).eval()
+    if device == "cpu":
+        # int8 weights for the Linear layers: ~4x smaller, faster matmuls in the decoder
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    else:
+        torch.set_float32_matmul_precision("high")
+        if COMPILE_MODEL:
+            # Compile forward, which generate() calls once per token; the first
+            # call (warmup) pays the compile cost
+            model.forward = torch.compile(model.forward, dynamic=True)
+    
+    return processor, model
 
 
 def record_audio(duration=RECORDING_DURATION, sample_rate=SAMPLE_RATE):
-    """Record audio from microphone."""
+    """Record audio from microphone, stopping early once the speaker goes quiet."""
     # print(f"\n🎤 Recording for {duration} seconds...")
     # print("   Speak now! (Press Ctrl+C to stop early)\n")
     
+    # Imported here: only the CLI records, and PortAudio may be missing on servers
+    import sounddevice as sd
+    
+    block_size = sample_rate // BLOCKS_PER_SECOND
+    max_blocks = duration * BLOCKS_PER_SECOND
+    silence_limit = int(SILENCE_STOP_SECONDS * BLOCKS_PER_SECOND)
+    
+    # The audio thread only copies blocks out; all the checks run here
+    blocks = queue.Queue()
+    def callback(indata, frames, time_info, status):
+        blocks.put(indata[:, 0].copy())
+    
+    recorded = []
+    heard_speech = False
+    quiet = 0
     try:
-        # Show countdown while recording
-        import time
-        audio = sd.rec(int(duration * sample_rate), samplerate=sample_rate, channels=1, dtype='float32')
-        
-        for i in range(duration, 0, -1):
-            print(f"   ⏱️  {i} seconds remaining...", end='\r')
-            time.sleep(1)
-            # Check if we have enough audio (user might stop early)
-            if not sd.get_stream().active:
-                break
-        
-        sd.wait()  # Wait until recording is finished
+        with sd.InputStream(samplerate=sample_rate, channels=1, dtype='float32',
+                            blocksize=block_size, callback=callback):
+            while len(recorded) < max_blocks:
+                block = blocks.get()
+                recorded.append(block)
+                
+                # Show countdown while recording
+                if len(recorded) % BLOCKS_PER_SECOND == 1:
+                    print(f"   ⏱️  {duration - len(recorded) // BLOCKS_PER_SECOND} seconds remaining...", end='\r')
+                
+                # Stop once speech has been followed by enough quiet blocks
+                if np.sqrt(np.mean(block * block)) >= SILENCE_RMS:
+                    heard_speech, quiet = True, 0
+                elif heard_speech:
+                    quiet += 1
+                    if quiet >= silence_limit:
+                        break
         # print("   ✅ Recording complete!          ")
         
     except KeyboardInterrupt:
-        sd.stop()
         print("\n   ⏹️  Recording stopped early")
     
-    # Flatten to 1D array
-    audio = audio.flatten()
+    if not recorded:
+        logger.warning("No audio captured - check your microphone!")
+        return None
+    
+    # Join the blocks into one 1D array
+    audio = np.concatenate(recorded)
     
     # Check if audio was captured
     max_amp = np.max(np.abs(audio))
     # print(f"   📊 Audio level: {max_amp:.3f}")
     if max_amp < 0.01:
-        print("   ⚠️  Warning: Very low audio level - check your microphone!")
+        logger.warning("Very low audio level (%.3f) - check your microphone!", max_amp)
         return None
     
     return audio
@@ -76,30 +126,63 @@ def transcribe(audio, sample_rate=SAMPLE_RATE):
     # print("📝 Transcribing...")
     
     if audio is None:
-        print("   ❌ No audio to transcribe.")
+        logger.warning("No audio to transcribe.")
         return ""
-    # Process audio for Whisper
+    return transcribe_batch([audio], sample_rate)[0]
+
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE):
+    """Downmix to mono float32 and cut leading/trailing silence (keeping a short margin)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1, dtype=np.float32)
+    
+    mag = np.abs(audio)
+    if not mag.size:
+        return audio
+    loud = np.flatnonzero(mag > max(0.005, mag.max() * 0.02))
+    if not loud.size:
+        return audio
+    
+    margin = int(TRIM_MARGIN_SECONDS * sample_rate)
+    return audio[max(0, loud[0] - margin):loud[-1] + 1 + margin]
+
+
+def transcribe_batch(audios, sample_rate=SAMPLE_RATE):
+    """Transcribe several clips in one batched Whisper pass."""
+    processor, model = _get_pipeline()
+    audios = [trim_silence(audio, sample_rate) for audio in audios]
+    
+    # Process audio for Whisper (each clip is padded to the 30s window)
     input_features = processor(
-        audio, 
+        audios, 
         sampling_rate=sample_rate, 
         return_tensors="pt"
-    ).input_features.to(device)
+    ).input_features.to(device, dtype=dtype)
     
     # Create attention mask
     attention_mask = torch.ones(input_features.shape[:2], dtype=torch.long, device=device)
     
     # Generate transcription with explicit language setting to avoid warnings
-    with torch.no_grad():
+    with torch.inference_mode():
         predicted_ids = model.generate(
             input_features,
             attention_mask=attention_mask,
             language="en",
-            task="transcribe"
+            task="transcribe",
+            num_beams=1,
+            do_sample=False,
+            max_new_tokens=MAX_NEW_TOKENS
         )
     
     # Decode to text
-    transcription = processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
-    return transcription.strip()
+    transcriptions = processor.batch_decode(predicted_ids, skip_special_tokens=True)
+    return [t.strip() for t in transcriptions]
+
+
+def warmup():
+    """Run one silent clip through the model so the first real request skips kernel/cache setup."""
+    transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)])
 
 
 def main():
@@ -107,6 +190,11 @@ def main():
     # print("🎙️  Voice Input for Bank Form")
     # print("="*50)
     
+    print(f"Loading Whisper model: {MODEL_NAME}...")
+    print("(This may take a minute on first run as it downloads the model)\n")
+    _get_pipeline()
+    print(f"Model loaded on: {device} ({dtype})")
+    
     while True:
         input("\nPress Enter to start recording (or Ctrl+C to exit)...")
         